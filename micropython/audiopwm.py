@@ -2,18 +2,134 @@
 from __future__ import annotations
 
 import _thread
+import array
 import time
+import uctypes
 
-from machine import PWM, Pin
+from machine import I2S, PWM, Pin, Timer
 
 try:  # pragma: no cover - MicroPython specific
+    import micropython
     from micropython import const
 except ImportError:  # pragma: no cover - CPython compatibility for linting
+    class micropython:  # noqa: N801
+        @staticmethod
+        def viper(func):
+            return func
+
     def const(value):
         return value
 
 
-_DEFAULT_CHUNK_SIZE = const(1024)
+# Module-level alias: one global lookup instead of a `time` attribute fetch.
+_sleep_ms = time.sleep_ms
+
+_DEFAULT_CHUNK_SIZE = const(4096)
+# SPIFFS logical block; reads of whole blocks avoid split flash accesses.
+_FLASH_BLOCK = const(4096)
+_CACHE_LINE = const(32)
+# LEDC counts on the 80 MHz APB clock; carrier = clock >> duty resolution.
+_LEDC_CLK_HZ = const(80_000_000)
+_MIN_PWM_BITS = const(6)
+# LEDC on the ESP32-C3 resolves ~10-12 bits at audio carriers, so the PWM
+# path always plays 8-bit levels; 16-bit clips are requantised per chunk.
+_OUT_BITS = const(8)
+
+# Sample-format constants, folded into immediates by the compiler.
+_MID8 = const(128)
+_MAX8 = const(255)
+_SIGN16 = const(0x8000)
+_Q8_ONE = const(256)
+_Q8_HALF = const(128)
+
+# Slots of 8-bit levels in flight between the producer and the timer
+# callback.
+# Must be a power of two; 4 x 100 ms rides out SPIFFS stalls.
+_POOL_SLOTS = const(4)
+_SLOT_MASK = const(_POOL_SLOTS - 1)
+
+# Slots of the playback state array shared by the timer callback, the
+# producer thread and the viper helpers.
+_IDX_SLOT = const(0)  # pool slot being played
+_IDX_POS = const(1)  # sample position within that slot
+_IDX_LEN = const(2)  # valid samples per pool slot, one entry each
+# Set by stop(), cleared only by play_file(): a worker that reset it on
+# exit could let a still-running worker miss the stop and hang stop().
+_IDX_STOP = const(_IDX_LEN + _POOL_SLOTS)
+_IDX_EOF = const(_IDX_STOP + 1)
+# Volume in Q8 fixed point, 0..256. Since it never exceeds unity gain,
+# (centered * vol + 128) >> 8 stays within the sample range: no clamping.
+_IDX_VOL = const(_IDX_EOF + 1)
+_IDX_CHUNK = const(_IDX_VOL + 1)  # samples per pool slot (~100 ms)
+_IDX_SIGNED = const(_IDX_CHUNK + 1)
+_IDX_LITTLE = const(_IDX_SIGNED + 1)
+_STATE_SIZE = const(_IDX_LITTLE + 1)
+
+
+def _pick_pwm_freq(sample_rate: int, sample_bits: int) -> int:
+    # Highest LEDC resolution (up to sample_bits) whose carrier still spans
+    # at least four periods per sample, so the RC filter can smooth it. An
+    # exact power-of-two divider keeps every duty bit usable.
+    bits = sample_bits
+    while bits > _MIN_PWM_BITS and (_LEDC_CLK_HZ >> bits) < sample_rate * 4:
+        bits -= 1
+    return _LEDC_CLK_HZ >> bits
+
+
+@micropython.viper
+def _viper_decode16(src: ptr16, dst: ptr8, n: int) -> int:
+    # Native signed 16-bit samples to 8-bit output levels at unity gain
+    # (_tick applies the volume), with +/-0.5 LSB of pseudo-random dither to
+    # decorrelate the requantisation error from the signal.
+    i = 0
+    while i < n:
+        # Flipping the sign bit gives the offset-binary value 0..65535.
+        value = int(src[i]) ^ _SIGN16
+        value = (value + ((i * 27073) & 0xFF) - 128) >> 8
+        # Dither can push full-scale samples one level out of range.
+        if value < 0:
+            value = 0
+        elif value > _MAX8:
+            value = _MAX8
+        dst[i] = value
+        i += 1
+    return n
+
+
+# Firmware built with micropython/modules/audiopwm provides the same kernel
+# in C; otherwise use the viper version above.
+try:  # pragma: no cover - optional user C module
+    from _audiopwm_c import decode16 as _decode16
+except ImportError:
+    _decode16 = _viper_decode16
+
+
+def _aligned(size: int) -> memoryview:
+    # Cache-line aligned window of a slightly larger allocation.
+    buf = bytearray(size + _CACHE_LINE - 1)
+    offset = -uctypes.addressof(buf) & (_CACHE_LINE - 1)
+    return memoryview(buf)[offset : offset + size]
+
+
+@micropython.viper
+def _pcm16_from8(src: ptr8, dst: ptr16, n: int, vol_q8: int) -> int:
+    # Unsigned 8-bit samples to signed 16-bit PCM at the given volume.
+    i = 0
+    while i < n:
+        dst[i] = (((int(src[i]) - _MID8) << 8) * vol_q8 + _Q8_HALF) >> 8
+        i += 1
+    return n
+
+
+@micropython.viper
+def _pcm16_from16(src: ptr16, dst: ptr16, n: int, vol_q8: int) -> int:
+    # Native signed 16-bit samples rescaled to the given volume.
+    i = 0
+    while i < n:
+        centered = (int(src[i]) ^ _SIGN16) - _SIGN16
+        dst[i] = (centered * vol_q8 + _Q8_HALF) >> 8
+        i += 1
+    return n
 
 
 class AudioPWM:
@@ -22,15 +138,18 @@ class AudioPWM:
     def __init__(
         self,
         pin: int = 2,
-        pwm_base_freq: int = 20_000,
+        pwm_base_freq: int | None = None,
         sample_rate: int = 8_000,
         chunk_size: int = _DEFAULT_CHUNK_SIZE,
         sample_bits: int = 8,
         signed: bool | None = None,
         little_endian: bool = True,
+        timer_id: int = 0,
+        use_i2s: bool = False,
+        i2s_id: int = 0,
+        i2s_sck: int | None = None,
+        i2s_ws: int | None = None,
     ) -> None:
-        self._pin = Pin(pin, Pin.OUT)
-        self._pwm = PWM(self._pin, freq=pwm_base_freq, duty_u16=0)
         self._sample_rate = sample_rate
         if sample_bits not in (8, 16):
             raise ValueError("sample_bits must be 8 or 16")
@@ -41,31 +160,98 @@ class AudioPWM:
             self._signed = bool(signed)
         self._little_endian = bool(little_endian)
         self._bytes_per_sample = self._sample_bits // 8
-        self._max_value = (1 << self._sample_bits) - 1
-        self._midpoint = 1 << (self._sample_bits - 1)
-        self._duty_scale = 257 if self._sample_bits == 8 else 1
-        chunk = int(chunk_size)
-        if chunk < 128:
-            chunk = 128
-        remainder = chunk % self._bytes_per_sample
-        if remainder:
-            chunk += self._bytes_per_sample - remainder
-        if chunk < self._bytes_per_sample:
-            chunk = self._bytes_per_sample
-        self._chunk_size = chunk
-        self._volume = 1.0
+        # Read whole SPIFFS blocks (at least one); a block always holds a
+        # whole number of samples.
+        blocks = (int(chunk_size) + _FLASH_BLOCK - 1) // _FLASH_BLOCK
+        self._chunk_size = max(blocks, 1) * _FLASH_BLOCK
+        self._pwm = None
+        self._timer = None
+        self._i2s = None
+        if use_i2s:
+            if i2s_sck is None or i2s_ws is None:
+                raise ValueError("use_i2s requires i2s_sck and i2s_ws pins")
+            # Signed 16-bit PCM for one chunk, written per I2S transfer.
+            self._pcm = bytearray(self._chunk_size * 2 // self._bytes_per_sample)
+            # `pin` becomes the I2S data line; DMA clocks samples out. The
+            # DMA buffer holds two PCM chunks: enough to cover a flash read
+            # without queueing seconds of audio. stop() deinits the bus to
+            # drop whatever is queued and play_file() re-inits it.
+            self._i2s_config = {
+                "sck": Pin(i2s_sck),
+                "ws": Pin(i2s_ws),
+                "sd": Pin(pin),
+                "mode": I2S.TX,
+                "bits": 16,
+                "format": I2S.MONO,
+                "rate": self._sample_rate,
+                "ibuf": len(self._pcm) * 2,
+            }
+            self._i2s = I2S(i2s_id, **self._i2s_config)
+            wide = _pcm16_from16
+            narrow = _pcm16_from8
+        else:
+            self._pin = Pin(pin, Pin.OUT)
+            if pwm_base_freq is None:
+                pwm_base_freq = _pick_pwm_freq(self._sample_rate, _OUT_BITS)
+            self._pwm = PWM(self._pin, freq=pwm_base_freq, duty_u16=0)
+            # Bound once so the timer callback does not allocate a bound method.
+            self._duty = self._pwm.duty_u16
+            self._timer = Timer(timer_id)
+            wide = _decode16
+            # 8-bit samples already are output levels: read straight into
+            # the pool, no decode pass.
+            narrow = None
+        # Chunk kernel for this format, picked once so the per-chunk and
+        # per-sample paths never branch on the sample width.
+        self._decode = narrow if self._bytes_per_sample == 1 else wide
+        self._sample_shift = self._bytes_per_sample - 1
+        state = array.array("i", [0] * _STATE_SIZE)
+        state[_IDX_VOL] = _Q8_ONE
+        # Each pool slot holds about 100 ms of audio, independent of the
+        # flash read size, so the pool stays small.
+        slot_size = self._sample_rate // 10
+        if self._pwm is not None and self._decode is None:
+            # Slots double as flash read buffers: a power of two never
+            # straddles a SPIFFS block.
+            size = 1
+            while size < slot_size:
+                size <<= 1
+            slot_size = size
+        state[_IDX_CHUNK] = slot_size
+        state[_IDX_SIGNED] = self._signed
+        state[_IDX_LITTLE] = self._little_endian
+        self._state = state
         self._file = None
-        self._buffer = bytearray(self._chunk_size)
-        self._buf_len = 0
-        self._buf_pos = 0
+        # Raw bytes of the chunk most recently read from flash; unused when
+        # 8-bit PWM reads go straight into the pool.
+        self._raw = None
+        if self._decode is not None:
+            self._raw = _aligned(self._chunk_size)
+        if self._pwm is not None:
+            # Pool of slots holding ready-to-emit 8-bit levels. The producer
+            # fills a free slot (reading or decoding straight into it) and
+            # publishes its length; the timer callback plays it in place and
+            # hands it back by zeroing the length. Slots are used in ring
+            # order, so the lengths double as the free/ready queues.
+            self._ring = _aligned(_POOL_SLOTS * slot_size)
+            self._slots = tuple(
+                self._ring[slot * slot_size : (slot + 1) * slot_size]
+                for slot in range(_POOL_SLOTS)
+            )
+            if self._decode is not None:
+                # Slot-sized windows of the raw read, each decoded into one slot.
+                piece = slot_size * self._bytes_per_sample
+                self._pieces = tuple(
+                    self._raw[start : start + piece]
+                    for start in range(0, self._chunk_size, piece)
+                )
         self._playing = False
-        self._stop_requested = False
-        self._thread_id = None
-        self._period_us = max(1, int(1_000_000 / self._sample_rate))
+        # Held by the worker thread for its whole lifetime; stop() waits on it.
+        self._done = _thread.allocate_lock()
 
     def set_volume(self, gain01: float) -> None:
         gain = 0.0 if gain01 < 0.0 else 1.0 if gain01 > 1.0 else gain01
-        self._volume = gain
+        self._state[_IDX_VOL] = int(gain * _Q8_ONE + 0.5)
 
     def play_file(self, path: str) -> bool:
         self.stop()
@@ -75,118 +261,235 @@ class AudioPWM:
             return False
 
         self._file = f
-        self._stop_requested = False
+        state = self._state
+        # The previous workers have exited (stop() waited on _done), so this
+        # is the only place the flag is ever cleared.
+        state[_IDX_STOP] = 0
+        state[_IDX_EOF] = 0
+        state[_IDX_SLOT] = 0
+        state[_IDX_POS] = 0
+        for slot in range(_POOL_SLOTS):
+            state[_IDX_LEN + slot] = 0
+        if self._raw is None:
+            data_len = self._read_chunk(self._slots[0])
+        else:
+            data_len = self._read_chunk(self._raw)
         self._playing = True
-        self._buf_len = 0
-        self._buf_pos = 0
 
-        if not self._refill():
+        if not data_len:
             self.stop()
             return False
 
-        self._thread_id = _thread.start_new_thread(self._playback_loop, ())
+        if self._i2s is not None:
+            self._i2s.init(**self._i2s_config)
+            self._start_worker(self._i2s_loop, data_len)
+            return True
+        if self._raw is None:
+            # 8-bit levels were read straight into slot 0.
+            state[_IDX_LEN] = data_len
+            self._start_worker(self._reader_loop, data_len)
+        else:
+            # Slots are decoded at unity gain; _tick applies the volume, so
+            # set_volume() takes effect on the next sample.
+            count = data_len >> self._sample_shift
+            if count > state[_IDX_CHUNK]:
+                count = state[_IDX_CHUNK]
+            state[_IDX_LEN] = self._decode(self._pieces[0], self._slots[0], count)
+            self._start_worker(self._producer_loop, data_len)
+        self._timer.init(
+            freq=self._sample_rate, mode=Timer.PERIODIC, callback=self._tick
+        )
         return True
 
+    def _start_worker(self, loop, data_len: int) -> None:
+        # The worker releases _done when it exits; take it only once the
+        # thread is certain to start, or stop() would wait forever.
+        self._done.acquire()
+        try:
+            _thread.start_new_thread(loop, (data_len,))
+        except BaseException:
+            self._done.release()
+            self.stop()
+            raise
+
     def is_playing(self) -> bool:
         return self._playing
 
     def stop(self) -> None:
-        self._stop_requested = True
+        state = self._state
+        state[_IDX_STOP] = 1
         self._playing = False
-        if self._thread_id is not None:
-            # Busy wait for the worker to exit.
-            while self._thread_id is not None:
-                time.sleep_ms(5)
+        if self._timer is not None:
+            self._timer.deinit()
+        # Blocks until the worker thread has exited (no-op when idle).
+        self._done.acquire()
+        self._done.release()
+        if self._i2s is not None:
+            self._i2s.deinit()
         if self._file is not None:
             try:
                 self._file.close()
             except OSError:
                 pass
             self._file = None
-        self._buf_pos = 0
-        self._buf_len = 0
-        self._pwm.duty_u16(0)
+        for slot in range(_POOL_SLOTS):
+            state[_IDX_LEN + slot] = 0
+        if self._pwm is not None:
+            self._pwm.duty_u16(0)
 
     # Internal methods -------------------------------------------------
-    def _playback_loop(self) -> None:
-        period = self._period_us
-        next_tick = time.ticks_add(time.ticks_us(), period)
+    def _reader_loop(self, data_len: int) -> None:
+        # 8-bit PWM: read flash straight into each free slot. play_file()
+        # already filled slot 0.
+        read_chunk = self._read_chunk
+        slots = self._slots
+        state = self._state
+        sleep_ms = _sleep_ms
+        idx = 1
         try:
-            while not self._stop_requested:
-                if self._buf_pos >= self._buf_len:
-                    if not self._refill():
-                        break
-                sample = self._next_sample()
-                duty = self._apply_volume(sample)
-                self._pwm.duty_u16(duty)
-
-                while time.ticks_diff(next_tick, time.ticks_us()) > 0:
-                    pass
-                next_tick = time.ticks_add(next_tick, period)
+            while data_len and not state[_IDX_STOP]:
+                while state[_IDX_LEN + idx]:
+                    if state[_IDX_STOP]:
+                        return
+                    sleep_ms(2)
+                data_len = read_chunk(slots[idx])
+                # Publishing the length hands the slot to the timer callback.
+                state[_IDX_LEN + idx] = data_len
+                idx = (idx + 1) & _SLOT_MASK
         finally:
-            self._playing = False
-            self._stop_requested = False
-            self._thread_id = None
-            self._pwm.duty_u16(0)
+            state[_IDX_EOF] = 1
+            self._done.release()
 
-    def _refill(self) -> bool:
-        if self._file is None:
-            return False
-        data = self._file.read(self._chunk_size)
-        if not data:
-            return False
-        data_len = len(data)
-        remainder = data_len % self._bytes_per_sample
-        if remainder:
-            data_len -= remainder
-            if data_len <= 0:
-                return False
-            self._buffer[:data_len] = data[:data_len]
-        else:
-            self._buffer[:data_len] = data
-        self._buf_len = data_len
-        self._buf_pos = 0
-        return True
+    def _producer_loop(self, data_len: int) -> None:
+        # play_file() already decoded the first piece of this read into slot 0.
+        read_chunk = self._read_chunk
+        decode = self._decode
+        shift = self._sample_shift
+        raw = self._raw
+        pieces = self._pieces
+        slots = self._slots
+        state = self._state
+        size = state[_IDX_CHUNK]
+        sleep_ms = _sleep_ms
+        idx = 1
+        piece = 1
+        try:
+            while data_len:
+                count = data_len >> shift
+                while piece * size < count:
+                    while state[_IDX_LEN + idx]:
+                        if state[_IDX_STOP]:
+                            return
+                        sleep_ms(2)
+                    n = count - piece * size
+                    if n > size:
+                        n = size
+                    # Publishing the length hands the slot to the timer callback.
+                    state[_IDX_LEN + idx] = decode(pieces[piece], slots[idx], n)
+                    idx = (idx + 1) & _SLOT_MASK
+                    piece += 1
+                if state[_IDX_STOP]:
+                    return
+                data_len = read_chunk(raw)
+                piece = 0
+        finally:
+            state[_IDX_EOF] = 1
+            self._done.release()
 
-    def _next_sample(self) -> int:
-        if self._bytes_per_sample == 1:
-            sample = self._buffer[self._buf_pos]
-            self._buf_pos += 1
-            if self._signed and sample >= 128:
-                sample -= 256
-            return sample
-
-        start = self._buf_pos
-        b0 = self._buffer[start]
-        b1 = self._buffer[start + 1]
-        self._buf_pos = start + 2
-        if self._little_endian:
-            value = b0 | (b1 << 8)
-        else:
-            value = (b0 << 8) | b1
-        if self._signed:
-            sign_bit = 1 << (self._sample_bits - 1)
-            mask = (1 << self._sample_bits) - 1
-            if value & sign_bit:
-                value = value - (mask + 1)
-        return value
+    def _i2s_loop(self, data_len: int) -> None:
+        read_chunk = self._read_chunk
+        decode = self._decode
+        shift = self._sample_shift
+        src = self._raw
+        pcm = self._pcm
+        pcm_view = memoryview(pcm)
+        write = self._i2s.write
+        state = self._state
+        try:
+            while data_len and not state[_IDX_STOP]:
+                # Blocks only while the DMA buffer is full; the I2S clock
+                # paces playback.
+                count = decode(src, pcm, data_len >> shift, state[_IDX_VOL])
+                write(pcm_view[: count * 2])
+                data_len = read_chunk(src)
+            # write() returns once the data is queued; keep reporting
+            # playback until the DMA buffer has drained.
+            remaining = self._i2s_config["ibuf"] * 500 // self._sample_rate
+            while remaining > 0 and not state[_IDX_STOP]:
+                _sleep_ms(10)
+                remaining -= 10
+        finally:
+            state[_IDX_EOF] = 1
+            self._playing = False
+            self._done.release()
 
-    def _apply_volume(self, sample: int) -> int:
-        if self._signed:
-            centered = sample * self._volume
-        else:
-            centered = (sample - self._midpoint) * self._volume
+    def _finish(self, timer) -> None:
+        timer.deinit()
+        self._playing = False
+        self._duty(0)
 
-        if centered >= 0:
-            centered = int(centered + 0.5)
-        else:
-            centered = int(centered - 0.5)
+    @micropython.viper
+    def _tick(self, timer):
+        # Timer callback: emit one decoded level at the current volume.
+        # Must not allocate.
+        state = ptr32(self._state)
+        idx = state[_IDX_SLOT]
+        end = state[_IDX_LEN + idx]
+        if end == 0:
+            # Underrun holds the last level; an empty slot after EOF ends playback.
+            if state[_IDX_EOF]:
+                self._finish(timer)
+            return
+        ring = ptr8(self._ring)
+        pos = state[_IDX_POS]
+        level = int(ring[idx * state[_IDX_CHUNK] + pos]) - _MID8
+        level = ((level * state[_IDX_VOL] + _Q8_HALF) >> 8) + _MID8
+        # Replicating the byte maps 0..255 onto the full 0..65535 duty range.
+        self._duty((level << 8) | level)
+        pos += 1
+        if pos >= end:
+            # Hand the drained slot back to the producer.
+            state[_IDX_LEN + idx] = 0
+            state[_IDX_SLOT] = (idx + 1) & _SLOT_MASK
+            pos = 0
+        state[_IDX_POS] = pos
 
-        value = centered + self._midpoint
+    def _read_chunk(self, buf) -> int:
+        if self._file is None:
+            return 0
+        # Read straight into the persistent buffer; no per-chunk allocation.
+        data_len = self._file.readinto(buf)
+        if not data_len:
+            return 0
+        data_len -= data_len % self._bytes_per_sample
+        if self._bytes_per_sample == 1:
+            if self._signed:
+                self._normalize8(buf, data_len)
+        elif not self._little_endian or not self._signed:
+            self._normalize16(buf, data_len >> 1)
+        return data_len
 
-        if value < 0:
-            value = 0
-        elif value > self._max_value:
-            value = self._max_value
+    @micropython.viper
+    def _normalize8(self, buf: ptr8, n: int):
+        # Rewrite n signed 8-bit samples in place as unsigned (offset binary).
+        i = 0
+        while i < n:
+            buf[i] = int(buf[i]) ^ 0x80
+            i += 1
 
-        return value * self._duty_scale
+    @micropython.viper
+    def _normalize16(self, buf: ptr16, n: int):
+        # Rewrite n samples in place as native (little-endian) signed 16-bit,
+        # so the per-sample paths never branch on the file format.
+        state = ptr32(self._state)
+        swap = state[_IDX_LITTLE] == 0
+        flip = state[_IDX_SIGNED] == 0
+        i = 0
+        while i < n:
+            value = int(buf[i])
+            if swap:
+                value = ((value & 0xFF) << 8) | (value >> 8)
+            if flip:
+                value ^= _SIGN16
+            buf[i] = value
+            i += 1
@@ -7,7 +7,7 @@ from audiopwm import AudioPWM
 
 
 PLAYER_PIN = 2
-PWM_BASE_FREQ = 20_000
+PWM_BASE_FREQ = None  # None: let AudioPWM pick the carrier
 SAMPLE_RATE = 8_000
 SAMPLE_BITS = 16
 SIGNED_SAMPLES = True
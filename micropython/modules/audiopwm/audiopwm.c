@@ -0,0 +1,57 @@
+// Optional C version of the audiopwm.py 16-bit chunk decoder.
+//
+// Built into the firmware as the `_audiopwm_c` user C module; audiopwm.py
+// falls back to its viper kernel when the module is not present. decode16
+// takes the same arguments as its viper counterpart:
+// (src, dst, n) -> n.
+
+#include "py/runtime.h"
+
+#define MAX8 (255)
+#define MID16 (32768)
+
+static void check_lengths(const mp_buffer_info_t *src, size_t src_width,
+    const mp_buffer_info_t *dst, mp_int_t n) {
+    if (n < 0 || (size_t)n * src_width > src->len || (size_t)n > dst->len) {
+        mp_raise_ValueError(MP_ERROR_TEXT("sample count exceeds buffer"));
+    }
+}
+
+// Native signed 16-bit samples to dithered 8-bit output levels at unity
+// gain. Matches _viper_decode16 bit for bit.
+static mp_obj_t audiopwm_decode16(mp_obj_t src_in, mp_obj_t dst_in, mp_obj_t n_in) {
+    mp_buffer_info_t src;
+    mp_buffer_info_t dst;
+    mp_get_buffer_raise(src_in, &src, MP_BUFFER_READ);
+    mp_get_buffer_raise(dst_in, &dst, MP_BUFFER_WRITE);
+    mp_int_t n = mp_obj_get_int(n_in);
+    check_lengths(&src, 2, &dst, n);
+
+    const int16_t *in = src.buf;
+    uint8_t *out = dst.buf;
+    for (mp_int_t i = 0; i < n; ++i) {
+        int32_t value = (int32_t)in[i] + MID16;
+        value = (value + (int32_t)((i * 27073) & 0xFF) - 128) >> 8;
+        if (value < 0) {
+            value = 0;
+        } else if (value > MAX8) {
+            value = MAX8;
+        }
+        out[i] = (uint8_t)value;
+    }
+    return MP_OBJ_NEW_SMALL_INT(n);
+}
+static MP_DEFINE_CONST_FUN_OBJ_3(audiopwm_decode16_obj, audiopwm_decode16);
+
+static const mp_rom_map_elem_t audiopwm_module_globals_table[] = {
+    { MP_ROM_QSTR(MP_QSTR___name__), MP_ROM_QSTR(MP_QSTR__audiopwm_c) },
+    { MP_ROM_QSTR(MP_QSTR_decode16), MP_ROM_PTR(&audiopwm_decode16_obj) },
+};
+static MP_DEFINE_CONST_DICT(audiopwm_module_globals, audiopwm_module_globals_table);
+
+const mp_obj_module_t audiopwm_user_cmodule = {
+    .base = { &mp_type_module },
+    .globals = (mp_obj_dict_t *)&audiopwm_module_globals,
+};
+
+MP_REGISTER_MODULE(MP_QSTR__audiopwm_c, audiopwm_user_cmodule);
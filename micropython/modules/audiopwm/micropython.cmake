@@ -0,0 +1,13 @@
+# CMake build (esp32 and rp2 ports):
+#   make USER_C_MODULES=/path/to/micropython/modules/audiopwm/micropython.cmake
+add_library(usermod_audiopwm INTERFACE)
+
+target_sources(usermod_audiopwm INTERFACE
+    ${CMAKE_CURRENT_LIST_DIR}/audiopwm.c
+)
+
+target_include_directories(usermod_audiopwm INTERFACE
+    ${CMAKE_CURRENT_LIST_DIR}
+)
+
+target_link_libraries(usermod INTERFACE usermod_audiopwm)
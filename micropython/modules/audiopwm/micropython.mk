@@ -0,0 +1,5 @@
+# Make build (unix and other make-based ports):
+#   make USER_C_MODULES=/path/to/micropython/modules
+AUDIOPWM_MOD_DIR := $(USERMOD_DIR)
+
+SRC_USERMOD_C += $(AUDIOPWM_MOD_DIR)/audiopwm.c